@@ -14,4 +14,7 @@ if __name__ == "__main__":
     else:
         scale = 1
 
-    make_graph(filepath, output_filepath, order, scale)
+    try:
+        make_graph(filepath, output_filepath, order, scale)
+    except ValueError as error:
+        print(error)
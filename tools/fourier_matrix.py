@@ -1,5 +1,18 @@
 import numpy as np
 
+
+def make_sieve(n, N):
+    if n == N:
+        sieve = np.array([1.0]*N)
+    elif n < 0:
+        sieve = np.array([0.0]*N)
+    else:
+        n = int(n)
+        t = n % 1
+        sieve = np.array([1.0]*n + [t] + [0.0]*(N - n - 1))
+    return sieve
+
+
 class Fourier_matrix:
     def __init__(self, N, M):
         self.N = N
@@ -20,17 +33,95 @@ class Fourier_matrix:
     def make_approximation(self, a, b, n):
         assert n <= self.N
 
-        if n == self.N:
-            sieve = np.array([1.0]*self.N)
-        elif n < 0:
-            sieve = np.array([0.0]*self.N)
-        else:
-            n = int(n)
-            t = n % 1
-            sieve = np.array([1.0]*n + [t] + [0.0]*(self.N - n - 1))
-
+        sieve = make_sieve(n, self.N)
         a_sieved = a * sieve
         b_sieved = b * sieve
         f_appr = self.COST.dot(a_sieved) + self.SINT.dot(b_sieved)
 
         return f_appr
+
+
+
+class Chunked_fourier_matrix:
+    """
+    Same interface as Fourier_matrix, but the N x M basis is never stored.
+
+    Blocks of at most `max_bytes` are generated on the fly: the first block of
+    rows in each column range is evaluated directly, and the following ones
+    are stepped forward with the angle-addition formulas
+        cos(x + h) = cos(x)cos(h) - sin(x)sin(h)
+        sin(x + h) = sin(x)cos(h) + cos(x)sin(h)
+    so peak memory does not depend on N or M.
+    """
+    def __init__(self, N, M, max_bytes=64 * 2**20, dtype=np.float64):
+        self.N = N
+        self.M = M
+        self.dtype = np.dtype(dtype)
+
+        # Four working arrays per block: COS, SIN and two scratch buffers
+        entries = max(1, max_bytes // (4 * self.dtype.itemsize))
+        self.rows = min(N, max(1, int(np.sqrt(entries))))
+        self.cols = min(M, max(1, entries // self.rows))
+
+
+    def blocks(self):
+        """
+        Yields (n0, n1, m0, m1, COS, SIN), where COS[i, j] = cos((n0+i+1) * 2pi (m0+j) / M).
+        The arrays are reused between iterations, so use them before asking for the next.
+        """
+        shape = (self.rows, self.cols)
+        COS = np.empty(shape, dtype=self.dtype)
+        SIN = np.empty(shape, dtype=self.dtype)
+        scratch_1 = np.empty(shape, dtype=self.dtype)
+        scratch_2 = np.empty(shape, dtype=self.dtype)
+
+        for m0 in range(0, self.M, self.cols):
+            m1 = min(m0 + self.cols, self.M)
+            angles = np.arange(m0, m1) * 2 * np.pi / self.M
+            cos_step = np.cos(self.rows * angles).astype(self.dtype)
+            sin_step = np.sin(self.rows * angles).astype(self.dtype)
+
+            C = COS[:, :m1-m0]
+            S = SIN[:, :m1-m0]
+            s1 = scratch_1[:, :m1-m0]
+            s2 = scratch_2[:, :m1-m0]
+
+            np.multiply.outer(np.arange(1, self.rows + 1), angles, out=s1)
+            np.cos(s1, out=C)
+            np.sin(s1, out=S)
+
+            for n0 in range(0, self.N, self.rows):
+                if n0 > 0:
+                    np.multiply(C, sin_step, out=s1)
+                    np.multiply(S, sin_step, out=s2)
+                    C *= cos_step
+                    C -= s2
+                    S *= cos_step
+                    S += s1
+                n1 = min(n0 + self.rows, self.N)
+                yield n0, n1, m0, m1, C[:n1-n0], S[:n1-n0]
+
+
+    def make_coeffs(self, f):
+        assert len(f) == self.M
+        f = np.asarray(f, dtype=self.dtype)
+        a = np.zeros(self.N)
+        b = np.zeros(self.N)
+        for n0, n1, m0, m1, C, S in self.blocks():
+            a[n0:n1] += C.dot(f[m0:m1])
+            b[n0:n1] += S.dot(f[m0:m1])
+        return a / self.M, b / self.M # Integral, divide by M to normalise
+
+
+    def make_approximation(self, a, b, n):
+        assert n <= self.N
+
+        sieve = make_sieve(n, self.N)
+        a_sieved = (a * sieve).astype(self.dtype)
+        b_sieved = (b * sieve).astype(self.dtype)
+
+        f_appr = np.zeros(self.M)
+        for n0, n1, m0, m1, C, S in self.blocks():
+            f_appr[m0:m1] += a_sieved[n0:n1].dot(C) + b_sieved[n0:n1].dot(S)
+
+        return f_appr
@@ -0,0 +1,245 @@
+import os
+import sys
+import zlib
+import struct
+import numpy as np
+from collections import deque
+from multiprocessing import Pool
+
+from PIL import Image, GifImagePlugin
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+
+# Writers: the workers encode each frame with `encode`, which is the slow
+# part, and the writer only adds the framing around the encoded frames and
+# writes them out in order, so nothing is kept around between frames.
+
+class Raw_writer:
+    # Plain rgb24 frames back to back, e.g. for piping into ffmpeg
+    def __init__(self, fp, width, height, n_frames, fps):
+        self.fp = fp
+
+    @staticmethod
+    def encode(frame, width, height, fps):
+        return frame
+
+    def write(self, data):
+        self.fp.write(data)
+
+    def close(self):
+        self.fp.flush()
+
+
+class Gif_writer:
+    def __init__(self, fp, width, height, n_frames, fps):
+        self.fp = fp
+
+        # Every frame has its own colour table, so the global one is unused
+        header, _ = GifImagePlugin.getheader(Image.new('P', (width, height)))
+        for chunk in header:
+            self.fp.write(chunk)
+        # Loop forever
+        self.fp.write(b'!\xff\x0bNETSCAPE2.0\x03\x01' + struct.pack('<H', 0) + b'\x00')
+
+    @staticmethod
+    def encode(frame, width, height, fps):
+        im = Image.frombytes('RGB', (width, height), frame).quantize()
+        duration = int(round(1000 / fps))
+        return b''.join(GifImagePlugin.getdata(im, duration=duration, include_color_table=True))
+
+    def write(self, data):
+        self.fp.write(data)
+
+    def close(self):
+        self.fp.write(b';')
+        self.fp.flush()
+
+
+class Apng_writer:
+    def __init__(self, fp, width, height, n_frames, fps):
+        self.fp = fp
+        self.width = width
+        self.height = height
+        self.delay = int(round(1000 / fps))
+        self.sequence = 0
+
+        self.fp.write(b'\x89PNG\r\n\x1a\n')
+        self.chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        self.chunk(b'acTL', struct.pack('>II', n_frames, 0))
+
+    def chunk(self, chunk_type, data):
+        self.fp.write(struct.pack('>I', len(data)))
+        self.fp.write(chunk_type + data)
+        self.fp.write(struct.pack('>I', zlib.crc32(chunk_type + data)))
+
+    @staticmethod
+    def encode(frame, width, height, fps):
+        # Every scanline is prefixed with filter type 0 (None)
+        rows = np.frombuffer(frame, dtype=np.uint8).reshape(height, 3 * width)
+        scanlines = np.hstack([np.zeros((height, 1), dtype=np.uint8), rows])
+        return zlib.compress(scanlines.tobytes())
+
+    def write(self, data):
+        self.chunk(b'fcTL', struct.pack('>IIIIIHHBB', self.sequence, self.width, self.height,
+                                        0, 0, self.delay, 1000, 0, 0))
+        if self.sequence == 0:
+            self.chunk(b'IDAT', data)
+            self.sequence += 1
+        else:
+            self.chunk(b'fdAT', struct.pack('>I', self.sequence + 1) + data)
+            self.sequence += 2
+
+    def close(self):
+        self.chunk(b'IEND', b'')
+        self.fp.flush()
+
+
+def writer_for(output_filepath):
+    extension = output_filepath.split('.')[-1].lower()
+    if extension == 'gif':
+        return Gif_writer
+    elif extension in ['png', 'apng']:
+        return Apng_writer
+    return Raw_writer
+
+
+
+# Workers: every process sets up one canvas when it starts, and then renders
+# chunks of consecutive frames on it.
+
+_worker = None
+
+
+def last_point(k, n_points, n_frames):
+    # Index of the last point of the curve shown in frame k
+    return ((k + 1) * (n_points - 1)) // n_frames
+
+
+def _init_worker(x, y, n_frames, figsize, dpi, encode, fps):
+    global _worker
+    fig = Figure(figsize=figsize, dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    x_margin = 0.05 * (max(x) - min(x))
+    y_margin = 0.05 * (max(y) - min(y))
+    ax.set_xlim(min(x) - x_margin, max(x) + x_margin)
+    ax.set_ylim(min(y) - y_margin, max(y) + y_margin)
+    ax.set_aspect('equal')
+    ax.set_autoscale_on(False)
+
+    # `segment` is animated, so canvas.draw() only renders the empty axes,
+    # and the curve is painted on top of that one frame's segment at a time.
+    # Butt caps keep neighbouring segments from overlapping more than the
+    # antialiased edge at the shared vertex.
+    segment, = ax.plot([], [], color='C0', solid_capstyle='butt', animated=True)
+
+    _worker = {
+        'x': x,
+        'y': y,
+        'n_frames': n_frames,
+        'canvas': canvas,
+        'ax': ax,
+        'segment': segment,
+        'encode': encode,
+        'fps': fps,
+        # Last frame whose segment is on the canvas, None before the first draw
+        'painted': None,
+    }
+
+
+def _paint_segment(k):
+    x = _worker['x']
+    y = _worker['y']
+    first = last_point(k - 1, len(x), _worker['n_frames'])
+    last = last_point(k, len(x), _worker['n_frames'])
+    _worker['segment'].set_data(x[first:last + 1], y[first:last + 1])
+    _worker['ax'].draw_artist(_worker['segment'])
+
+
+def _render_frames(start, stop):
+    canvas = _worker['canvas']
+    width, height = canvas.get_width_height()
+
+    # Frame k is always the empty axes with the segments of frames 0, ..., k
+    # painted on top in order, so the pixels do not depend on where a chunk
+    # starts. The canvas is kept from the worker's previous chunk, so only
+    # the segments in between need painting, unless this chunk comes earlier
+    # and the canvas has to be started over.
+    if _worker['painted'] is None or start <= _worker['painted']:
+        canvas.draw()
+        _worker['painted'] = -1
+    for k in range(_worker['painted'] + 1, start):
+        _paint_segment(k)
+
+    frames = []
+    for k in range(start, stop):
+        _paint_segment(k)
+        frame = np.asarray(canvas.buffer_rgba())[:, :, :3].tobytes()
+        frames.append(_worker['encode'](frame, width, height, _worker['fps']))
+    _worker['painted'] = stop - 1
+    return frames
+
+
+
+def make_animation(x, y, output_filepath, n_frames=100, fps=25, processes=None,
+                   chunk_size=10, figsize=(8, 6), dpi=100):
+    """
+    Animates the curve (x, y) being traced out, e.g. as returned by make_graph.
+
+    The output format follows the file extension: `.gif` gives a GIF, `.png`
+    or `.apng` an animated PNG, and anything else raw rgb24 frames, with `-`
+    meaning stdout. Frames are rendered in chunks of `chunk_size` on a pool of
+    `processes` workers, which also encode them, and written in order as soon
+    as they are ready.
+
+    Returns the (width, height) of the frames.
+    """
+    x = np.array(x, dtype=float)
+    y = np.array(y, dtype=float)
+    assert len(x) == len(y)
+    assert len(x) >= 2, 'Need at least two points to animate a curve'
+    assert n_frames >= 1, 'Need at least one frame'
+    n_frames = min(n_frames, len(x) - 1)
+
+    processes = processes or os.cpu_count()
+    width, height = FigureCanvasAgg(Figure(figsize=figsize, dpi=dpi)).get_width_height()
+    chunks = [(start, min(start + chunk_size, n_frames)) for start in range(0, n_frames, chunk_size)]
+
+    if output_filepath == '-':
+        fp = sys.stdout.buffer
+    else:
+        fp = open(output_filepath, 'wb')
+
+    try:
+        Writer = writer_for(output_filepath)
+        writer = Writer(fp, width, height, n_frames, fps)
+        with Pool(processes, _init_worker, (x, y, n_frames, figsize, dpi, Writer.encode, fps)) as pool:
+            # Only keep a couple of chunks per worker in flight, so that memory
+            # does not grow with the number of frames. Chunks are handed out in
+            # order, so a worker's next chunk is nearly always later than its
+            # last one, and it paints every segment about once in total.
+            max_pending = 2 * processes
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.apply_async(_render_frames, chunk))
+                if len(pending) >= max_pending:
+                    for frame in pending.popleft().get():
+                        writer.write(frame)
+            while pending:
+                for frame in pending.popleft().get():
+                    writer.write(frame)
+        writer.close()
+    except BaseException:
+        # Don't leave a half-written animation behind
+        if fp is not sys.stdout.buffer:
+            fp.close()
+            os.remove(output_filepath)
+        raise
+
+    if fp is not sys.stdout.buffer:
+        fp.close()
+
+    return width, height
@@ -39,9 +39,8 @@ def sampler(f, M):
 def make_graph(filepath, output_filepath, order, scale):
     filetype = filepath[-3:]
     if not filetype in ['png', 'svg']:
-        print('File format not recognised!')
-        print('Rename file (.svg, .png), or convert to the correct format and try again.')
-        return
+        raise ValueError('File format not recognised!\n'
+                         'Rename file (.svg, .png), or convert to the correct format and try again.')
 
     print('(1/6) Finding path from {}'.format(filepath), flush=True)
     if filetype == 'svg':
@@ -107,3 +106,5 @@ def make_graph(filepath, output_filepath, order, scale):
         f.write(latex_complete)
 
     print('\nAll done!', flush=True)
+
+    return x_appr, y_appr